@@ -1,3 +1,4 @@
 from lleaves.compiler.ast.parser import parse_to_ast
+from lleaves.compiler.ast.simplify import prune
 
-__all__ = ["parse_to_ast"]
+__all__ = ["parse_to_ast", "prune"]
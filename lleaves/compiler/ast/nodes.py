@@ -1,10 +1,15 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from typing import List
 
 from lleaves.compiler.utils import DecisionType
 
 
 class Node:
+    # Forests can have millions of nodes, so nodes (and trees) declare __slots__
+    # instead of carrying a per-instance __dict__.
+    # Declared by hand, since dataclass(slots=True) requires Python 3.10.
+    __slots__ = ()
+
     @property
     def is_leaf(self):
         return isinstance(self, LeafNode)
@@ -12,6 +17,8 @@ class Node:
 
 @dataclass
 class Tree:
+    __slots__ = ("idx", "root_node", "features", "class_id")
+
     idx: int
     root_node: Node
     features: list
@@ -37,12 +44,17 @@ class Forest:
 
 @dataclass
 class DecisionNode(Node):
-    # the threshold in bit-representation if this node is categorical
-    cat_threshold: List[int] = field(default=None, init=False)
-
-    # child nodes
-    left: Node = field(default=None, init=False)
-    right: Node = field(default=None, init=False)
+    __slots__ = (
+        "idx",
+        "split_feature",
+        "threshold",
+        "decision_type",
+        "left_idx",
+        "right_idx",
+        "cat_threshold",
+        "left",
+        "right",
+    )
 
     idx: int
     split_feature: int
@@ -51,6 +63,14 @@ class DecisionNode(Node):
     left_idx: int
     right_idx: int
 
+    def __post_init__(self):
+        # slots can't carry class-level defaults, so these are set here instead.
+        # the threshold in bit-representation if this node is categorical
+        self.cat_threshold: List[int] = None
+        # child nodes
+        self.left: Node = None
+        self.right: Node = None
+
     def add_children(self, left, right):
         self.left = left
         self.right = right
@@ -71,6 +91,8 @@ class DecisionNode(Node):
 
 @dataclass
 class LeafNode(Node):
+    __slots__ = ("idx", "value")
+
     idx: int
     value: float
 
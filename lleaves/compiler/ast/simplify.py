@@ -0,0 +1,54 @@
+"""
+Simplifications of the Abstract-Syntax Tree (AST) that don't change the forest's predictions.
+"""
+
+import math
+
+from lleaves.compiler.utils import MissingType
+
+
+def prune(forest):
+    """
+    Removes decision nodes which always take the same branch, replacing them by that branch.
+    Fewer nodes means less code to generate and a smaller instruction-cache footprint.
+    """
+    for tree in forest.trees:
+        tree.root_node = _skip_constant_nodes(tree.root_node)
+        # iterative DFS, recursion would overflow the stack for very deep trees
+        stack = [tree.root_node]
+        while stack:
+            node = stack.pop()
+            if node.is_leaf:
+                continue
+            node.add_children(
+                _skip_constant_nodes(node.left), _skip_constant_nodes(node.right)
+            )
+            stack += [node.right, node.left]
+
+
+def _skip_constant_nodes(node):
+    """Follows the branches of decision nodes that are always taken, returns the first node that isn't constant."""
+    while not node.is_leaf:
+        child = _constant_branch(node)
+        if child is None:
+            break
+        node = child
+    return node
+
+
+def _constant_branch(node):
+    """Returns the child that the decision node always branches to, or None if it depends on the input."""
+    if node.decision_type.is_categorical:
+        # an empty bitset never matches, all values (including NaNs) go right.
+        # A full bitset isn't constant: values outside of the bitset still go right.
+        if not any(node.cat_threshold):
+            return node.right
+    elif node.threshold == math.inf:
+        # every value except missing values satisfies 'val <= inf', missing values go to the default branch.
+        # For missing type None NaNs are mapped to 0.0, which goes left as well.
+        if (
+            node.decision_type.missing_type == MissingType.MNone
+            or node.decision_type.is_default_left
+        ):
+            return node.left
+    return None
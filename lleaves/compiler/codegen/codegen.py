@@ -41,7 +41,9 @@ class LTree:
     class_id: int
 
 
-def gen_forest(forest, module, fblocksize, froot_func_name):
+def gen_forest(
+    forest, module, fblocksize, fbatchsize, flayout, finline, froot_func_name
+):
     """
     Populate the passed IR module with code for the forest.
 
@@ -54,6 +56,13 @@ def gen_forest(forest, module, fblocksize, froot_func_name):
       of all @tree_<index> calls are summed up into a result variable.
     - The final result variable is run through the objective function (eg sigmoid)
       and stored in the results array passed by the caller.
+    If fbatchsize > 1, rows are processed in batches of fbatchsize, with one result variable per row.
+    The remaining rows are processed one-by-one. When inlining, the tree functions are marked 'alwaysinline'
+    so that each batch becomes a single block of independent tree evaluations.
+
+    The input array is either row-major (flayout="C") or column-major (flayout="F").
+    For column-major input @forest_root takes the total number of rows of the input array as an additional
+    argument, which is the stride between two columns.
 
     The actual IR is slightly more complicated, because lleaves implements instruction cache blocking.
     The full set of tree_functions is divided into chunks, with each chunk containing a subset of tree_functions.
@@ -66,23 +75,29 @@ def gen_forest(forest, module, fblocksize, froot_func_name):
         for row in range(len(input)):
            result[row] += tree(input[row])
     ...
+    The first chunk stores its sums instead of adding them to the results array, so the results array
+    is never read for forests that fit into a single chunk.
 
     For each tree in the forest there is a @tree_<index> function which takes all attributes as arguments
 
-    For each node there are 0-2 blocks in the @tree_<index> function.
-    - Decision node (categorical): 2 Blocks, 1 for the node, 1 for the categorical bitset-comparison
-    - Decision node (numerical): 1 Block.
+    For each node there are 0-1 blocks in the @tree_<index> function.
+    - Decision node (categorical or numerical): 1 Block. The categorical bitset-comparison is branchless.
     - Leaf node: 0-1 Blocks. If a decision node has only leaves as children we fuse both leaves into
-      a single switch instr in the decision node's block.
+      a single select instr in the decision node's block.
     Each node cbranches to the child node's block.
+    A subtree of categorical decision nodes which all split on the same feature is emitted as a single
+    block with a switch over all categories, which branches directly to the leaves' blocks.
 
     :return: None
     """
 
     # entry function called from Python
+    root_func_args = (DOUBLE_PTR, DOUBLE_PTR, INT, INT)
+    if flayout == "F":
+        root_func_args += (INT,)
     root_func = ir.Function(
         module,
-        ir.FunctionType(ir.VoidType(), (DOUBLE_PTR, DOUBLE_PTR, INT, INT)),
+        ir.FunctionType(ir.VoidType(), root_func_args),
         name=froot_func_name,
     )
 
@@ -92,6 +107,15 @@ def gen_forest(forest, module, fblocksize, froot_func_name):
         scalar_func_t = ir.FunctionType(DOUBLE, func_dtypes)
         tree_func = ir.Function(module, scalar_func_t, name=str(tree))
         tree_func.linkage = "private"
+        # tree functions only depend on their arguments and constants, which lets LLVM
+        # hoist, merge and reorder calls freely
+        tree_func.attributes.add("readnone")
+        tree_func.attributes.add("nounwind")
+        tree_func.calling_convention = "fastcc"
+        if finline:
+            # the tree function is called once per row of a batch, so LLVM's
+            # inliner wouldn't inline it without being told to
+            tree_func.attributes.add("alwaysinline")
         # populate function with IR
         gen_tree(tree, tree_func)
         return LTree(llvm_function=tree_func, class_id=tree.class_id)
@@ -102,88 +126,226 @@ def gen_forest(forest, module, fblocksize, froot_func_name):
         # better locality by running trees for each class together
         tree_funcs.sort(key=lambda t: t.class_id)
 
-    _populate_forest_func(forest, root_func, tree_funcs, fblocksize)
+    _populate_forest_func(forest, root_func, tree_funcs, fblocksize, fbatchsize)
 
 
 def gen_tree(tree, tree_func):
-    """generate code for tree given the function, recursing into nodes"""
-    node_block = tree_func.append_basic_block(name=str(tree.root_node))
-    gen_node(tree_func, node_block, tree.root_node)
-
-
-def gen_node(func, node_block, node):
-    """generate code for node, recursing into children"""
-    if node.is_leaf:
-        _gen_leaf_node(node_block, node)
-    else:
-        _gen_decision_node(func, node_block, node)
+    """generate code for tree given the function"""
+    nodes, switches = _collect_block_nodes(tree.root_node)
+    # allocate the blocks for all nodes upfront, so branches can target blocks that are populated later
+    blocks = {id(node): tree_func.append_basic_block(name=str(node)) for node in nodes}
+
+    builder = ir.IRBuilder()
+    for node in nodes:
+        builder.position_at_end(blocks[id(node)])
+        if node.is_leaf:
+            _gen_leaf_node(builder, node)
+        else:
+            _gen_decision_node(tree_func, builder, node, blocks, switches.get(id(node)))
 
 
-def _gen_leaf_node(node_block, leaf):
+def _collect_block_nodes(root_node):
+    """
+    Walks the tree depth-first and collects all nodes that need their own block.
+    Also returns the categorical switches (see _get_categorical_switch) of decision nodes, by id(node).
+    """
+    n_cat_nodes = _count_categorical_subtree_nodes(root_node)
+    nodes = []
+    switches = {}
+    stack = [root_node]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        if node.is_leaf:
+            continue
+
+        # optimization for subtrees of >1 categorical nodes on the same feature (switch instead of cbranches)
+        if n_cat_nodes.get(id(node), 0) > 1:
+            switch = _get_categorical_switch(node)
+            switches[id(node)] = switch
+            default_leaf, cases = switch
+            leaves = {id(leaf): leaf for leaf in [default_leaf, *cases.values()]}
+            stack += list(leaves.values())[::-1]
+        # optimization for node where both children are leaves (select instead of cbranch)
+        elif not (node.left.is_leaf and node.right.is_leaf):
+            stack += [node.right, node.left]
+    return nodes, switches
+
+
+def _gen_leaf_node(builder, leaf):
     """populate block with leaf's return value"""
-    builder = ir.IRBuilder(node_block)
     builder.ret(dconst(leaf.value))
 
 
-def _gen_decision_node(func, node_block, node):
-    """generate code for decision node, recursing into children"""
-    builder = ir.IRBuilder(node_block)
-
-    # optimization for node where both children are leaves (switch instead of cbranch)
-    is_fused_double_leaf_node = node.left.is_leaf and node.right.is_leaf
-    if is_fused_double_leaf_node:
-        left_block = None
-        right_block = None
-        # categorical nodes have a fastpath which can branch-right early
-        # so they still need a right block
-        if node.decision_type.is_categorical:
-            right_block = func.append_basic_block(name=str(node.right))
-    else:
-        left_block = func.append_basic_block(name=str(node.left))
-        right_block = func.append_basic_block(name=str(node.right))
+def _gen_decision_node(func, builder, node, blocks, switch):
+    """populate block with decision node's IR, branching to the children's blocks"""
+    if switch:
+        _gen_categorical_switch(func, builder, node, blocks, *switch)
+        return
 
     # populate this node's block up to the terminal statement
     if node.decision_type.is_categorical:
-        bitset_comp_block = builder.append_basic_block(str(node) + "_cat_bitset_comp")
-        bitset_builder = ir.IRBuilder(bitset_comp_block)
-        comp = _populate_categorical_node_block(
-            func, builder, bitset_builder, node, bitset_comp_block, right_block
-        )
-        builder = bitset_builder
+        comp = _populate_categorical_node_block(func, builder, node)
     else:
         comp = _populate_numerical_node_block(func, builder, node)
 
     # finalize this node's block with a terminal statement
-    if is_fused_double_leaf_node:
+    if node.left.is_leaf and node.right.is_leaf:
         ret = builder.select(comp, dconst(node.left.value), dconst(node.right.value))
         builder.ret(ret)
     else:
-        builder.cbranch(comp, left_block, right_block)
+        builder.cbranch(comp, blocks[id(node.left)], blocks[id(node.right)])
+
 
-    # populate generated child blocks
-    if left_block:
-        gen_node(func, left_block, node.left)
-    if right_block:
-        gen_node(func, right_block, node.right)
+def _count_categorical_subtree_nodes(root_node):
+    """
+    Finds the decision nodes whose subtree consists only of categorical decision nodes which all split
+    on the same feature. Returns the number of decision nodes in each such subtree, by id(node).
+    Computed bottom-up in a single pass over the tree.
+    """
+    n_cat_nodes = {}
+    # post-order DFS: a node is processed once both its children have been processed
+    stack = [(root_node, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if node.is_leaf:
+            continue
+        if not children_done:
+            stack += [(node, True), (node.right, False), (node.left, False)]
+            continue
+        if not node.decision_type.is_categorical:
+            continue
+        count = 1
+        for child in (node.left, node.right):
+            if child.is_leaf:
+                continue
+            if (
+                id(child) not in n_cat_nodes
+                or child.split_feature != node.split_feature
+            ):
+                break
+            count += n_cat_nodes[id(child)]
+        else:
+            n_cat_nodes[id(node)] = count
+    return n_cat_nodes
+
+
+def _get_categorical_switch(node):
+    """
+    Builds the switch for a subtree of categorical decision nodes which all split on the same feature.
+    Returns the leaf that all categories not present in any bitset go to
+    and the mapping category -> leaf for all other categories.
+    """
+    decision_nodes = []
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if not n.is_leaf:
+            decision_nodes.append(n)
+            stack += [n.left, n.right]
+
+    def goes_left(n, category):
+        bit_vec_idx, shift = divmod(category, 32)
+        return (
+            bit_vec_idx < len(n.cat_threshold)
+            and (n.cat_threshold[bit_vec_idx] >> shift) & 1
+        )
+
+    def get_leaf(category):
+        n = node
+        while not n.is_leaf:
+            n = n.left if goes_left(n, category) else n.right
+        return n
+
+    # categories that aren't in any bitset (including negative values & NaNs) always go right
+    default_leaf = node
+    while not default_leaf.is_leaf:
+        default_leaf = default_leaf.right
+
+    categories = sorted(
+        {
+            bit_vec_idx * 32 + shift
+            for n in decision_nodes
+            for bit_vec_idx, bit_vec in enumerate(n.cat_threshold)
+            for shift in range(32)
+            if (bit_vec >> shift) & 1
+        }
+    )
+    cases = {category: get_leaf(category) for category in categories}
+    cases = {
+        category: leaf for category, leaf in cases.items() if leaf is not default_leaf
+    }
+    return default_leaf, cases
+
+
+def _gen_categorical_switch(func, builder, node, blocks, default_leaf, cases):
+    """populate block with a switch over the categories of a subtree, branching to the leaves' blocks"""
+    val = func.args[node.split_feature]
+    switch = builder.switch(val, blocks[id(default_leaf)])
+    for category, leaf in cases.items():
+        switch.add_case(ir.Constant(INT_CAT, category), blocks[id(leaf)])
 
 
 def _populate_instruction_block(
-    forest, root_func, tree_funcs, setup_block, next_block, eval_obj_func
+    forest,
+    root_func,
+    tree_funcs,
+    setup_block,
+    next_block,
+    eval_obj_func,
+    init_out,
+    batchsize,
 ):
     """Generates an instruction_block: loops over all input data and evaluates its chunk of tree_funcs."""
-    data_arr, out_arr, start_index, end_index = root_func.args
+    start_index, end_index = root_func.args[2:4]
 
     # -- SETUP BLOCK
     builder = ir.IRBuilder(setup_block)
     start_index = builder.zext(start_index, LONG)
     end_index = builder.zext(end_index, LONG)
+    # for column-major input the number of rows is passed as an extra argument, None for row-major
+    n_rows = builder.zext(root_func.args[4], LONG) if len(root_func.args) > 4 else None
     loop_iter = builder.alloca(LONG, 1, "loop-idx")
     builder.store(start_index, loop_iter)
     condition_block = root_func.append_basic_block("loop-condition")
-    builder.branch(condition_block)
+    if batchsize > 1:
+        batch_condition_block = root_func.append_basic_block("batch-loop-condition")
+        builder.branch(batch_condition_block)
+    else:
+        builder.branch(condition_block)
     # -- END SETUP BLOCK
 
+    if batchsize > 1:
+        # -- BATCH CONDITION BLOCK
+        builder = ir.IRBuilder(batch_condition_block)
+        batch_end = builder.add(builder.load(loop_iter), lconst(batchsize))
+        comp = builder.icmp_signed("<=", batch_end, end_index)
+        batch_core_block = root_func.append_basic_block("batch-loop-core")
+        builder.cbranch(comp, batch_core_block, condition_block)
+        # -- END BATCH CONDITION BLOCK
+
+        # -- BATCH CORE LOOP BLOCK
+        # process batchsize rows at once. The tree evaluations for different rows are independent,
+        # which gives LLVM the freedom to interleave them once the tree functions are inlined.
+        builder = ir.IRBuilder(batch_core_block)
+        loop_iter_reg = builder.load(loop_iter)
+        rows = [builder.add(loop_iter_reg, lconst(k)) for k in range(batchsize)]
+        _populate_rows(
+            forest,
+            root_func,
+            builder,
+            tree_funcs,
+            rows,
+            n_rows,
+            eval_obj_func,
+            init_out,
+        )
+        builder.store(builder.add(loop_iter_reg, lconst(batchsize)), loop_iter)
+        builder.branch(batch_condition_block)
+        # -- END BATCH CORE LOOP BLOCK
+
     # -- CONDITION BLOCK
+    # if batching, this loops over the remaining (end_index - start_index) % batchsize rows
     builder = ir.IRBuilder(condition_block)
     comp = builder.icmp_signed("<", builder.load(loop_iter), end_index)
     core_block = root_func.append_basic_block("loop-core")
@@ -192,60 +354,183 @@ def _populate_instruction_block(
 
     # -- CORE LOOP BLOCK
     builder = ir.IRBuilder(core_block)
-    # build args arr, convert categoricals vars from float to int
-    args = []
     loop_iter_reg = builder.load(loop_iter)
+    _populate_rows(
+        forest,
+        root_func,
+        builder,
+        tree_funcs,
+        [loop_iter_reg],
+        n_rows,
+        eval_obj_func,
+        init_out,
+    )
+    builder.store(builder.add(loop_iter_reg, lconst(1)), loop_iter)
+    builder.branch(condition_block)
+    # -- END CORE LOOP BLOCK
 
-    n_args = ir.Constant(LONG, forest.n_args)
-    iter_mul_nargs = builder.mul(loop_iter_reg, n_args)
-    idx = (builder.add(iter_mul_nargs, lconst(i)) for i in range(forest.n_args))
-    raw_ptrs = [builder.gep(root_func.args[0], (c,)) for c in idx]
-    # cast the categorical inputs to integer
-    for feature, ptr in zip(forest.features, raw_ptrs):
-        el = builder.load(ptr)
-        if feature.is_categorical:
-            # first, check if the value is NaN
-            is_nan = builder.fcmp_ordered("uno", el, dconst(0.0))
-            # if it is, return smallest possible int (will always go right), else cast to int
-            el = builder.select(is_nan, iconst(-(2**31)), builder.fptosi(el, INT_CAT))
-            args.append(el)
-        else:
-            args.append(el)
-    # iterate over each tree, sum up results
-    results = [dconst(0.0) for _ in range(forest.n_classes)]
+
+def _populate_rows(
+    forest, root_func, builder, tree_funcs, rows, n_rows, eval_obj_func, init_out
+):
+    """
+    Evaluates the tree_funcs for each of the given rows and adds the results to the output array.
+    If init_out is set, the results overwrite the output array instead.
+    """
+    data_arr, out_arr = root_func.args[:2]
+
+    rows_args = _populate_rows_args(forest, builder, data_arr, rows, n_rows)
+
+    # iterate over each tree, sum up results.
+    # Each row keeps separate accumulators, so there are no dependencies between rows.
+    # The trees are added up in order, exactly like LightGBM does.
+    # Accumulators start out empty (None), the first tree's result is used as is instead of adding it to 0.0.
+    rows_results = [[None] * forest.n_classes for _ in rows]
     for func in tree_funcs:
-        tree_res = builder.call(func.llvm_function, args)
-        results[func.class_id] = builder.fadd(tree_res, results[func.class_id])
-    res_idx = builder.mul(lconst(forest.n_classes), loop_iter_reg)
-    results_ptr = [
-        builder.gep(out_arr, (builder.add(res_idx, lconst(class_idx)),))
-        for class_idx in range(forest.n_classes)
+        for args, results in zip(rows_args, rows_results):
+            tree_res = builder.call(
+                func.llvm_function,
+                args,
+                cconv=func.llvm_function.calling_convention,
+            )
+            acc = results[func.class_id]
+            results[func.class_id] = (
+                tree_res if acc is None else builder.fadd(tree_res, acc)
+            )
+
+    rows_results_ptr = []
+    for row in rows:
+        res_idx = builder.mul(lconst(forest.n_classes), row)
+        results_ptr = [
+            builder.gep(out_arr, (builder.add(res_idx, lconst(class_idx)),))
+            for class_idx in range(forest.n_classes)
+        ]
+        rows_results_ptr.append(results_ptr)
+
+    def add_to_out(result, result_ptr):
+        # a class might have no trees in this instruction block
+        if init_out:
+            return dconst(0.0) if result is None else result
+        prev_result = builder.load(result_ptr)
+        return prev_result if result is None else builder.fadd(result, prev_result)
+
+    rows_results = [
+        [
+            add_to_out(result, result_ptr)
+            for result, result_ptr in zip(results, results_ptr)
+        ]
+        for results, results_ptr in zip(rows_results, rows_results_ptr)
     ]
 
-    results = [
-        builder.fadd(result, builder.load(result_ptr))
-        for result, result_ptr in zip(results, results_ptr)
-    ]
     if eval_obj_func:
-        results = _populate_objective_func_block(
-            builder,
-            results,
-            forest.objective_func,
-            forest.objective_func_config,
-            forest.raw_score,
-        )
-    for result, result_ptr in zip(results, results_ptr):
-        builder.store(result, result_ptr)
-
-    builder.store(builder.add(loop_iter_reg, lconst(1)), loop_iter)
-    builder.branch(condition_block)
-    # -- END CORE LOOP BLOCK
+        if len(rows) > 1:
+            # evaluate the objective function for the whole batch at once, on one vector per class
+            vec_t = ir.VectorType(DOUBLE, len(rows))
+            vecs = []
+            for class_idx in range(forest.n_classes):
+                vec = ir.Constant(vec_t, ir.Undefined)
+                for k, results in enumerate(rows_results):
+                    vec = builder.insert_element(vec, results[class_idx], iconst(k))
+                vecs.append(vec)
+            vecs = _populate_objective_func_block(
+                builder,
+                vecs,
+                forest.objective_func,
+                forest.objective_func_config,
+                forest.raw_score,
+            )
+            rows_results = [
+                [builder.extract_element(vec, iconst(k)) for vec in vecs]
+                for k in range(len(rows))
+            ]
+        else:
+            rows_results = [
+                _populate_objective_func_block(
+                    builder,
+                    results,
+                    forest.objective_func,
+                    forest.objective_func_config,
+                    forest.raw_score,
+                )
+                for results in rows_results
+            ]
+
+    for results, results_ptr in zip(rows_results, rows_results_ptr):
+        for result, result_ptr in zip(results, results_ptr):
+            builder.store(result, result_ptr)
+
+
+def _populate_rows_args(forest, builder, data_arr, rows, n_rows):
+    """
+    Loads all attributes of the given consecutive rows, converting categoricals vars from float to int.
+    If n_rows is None, data_arr is row-major, else it's column-major with n_rows rows.
+    """
+    if n_rows is None:
+        n_args = ir.Constant(LONG, forest.n_args)
+        rows_raw_args = []
+        for row in rows:
+            iter_mul_nargs = builder.mul(row, n_args)
+            idx = (builder.add(iter_mul_nargs, lconst(i)) for i in range(forest.n_args))
+            raw_ptrs = [builder.gep(data_arr, (c,)) for c in idx]
+            rows_raw_args.append([builder.load(ptr) for ptr in raw_ptrs])
+    else:
+        cols_raw_args = []
+        for i in range(forest.n_args):
+            col_offset = builder.mul(lconst(i), n_rows)
+            ptr = builder.gep(data_arr, (builder.add(col_offset, rows[0]),))
+            if len(rows) > 1:
+                # the column's entries for the batch are contiguous, load them as a single vector
+                vec_t = ir.VectorType(DOUBLE, len(rows))
+                vec = builder.load(builder.bitcast(ptr, vec_t.as_pointer()), align=8)
+                cols_raw_args.append(
+                    [builder.extract_element(vec, iconst(k)) for k in range(len(rows))]
+                )
+            else:
+                cols_raw_args.append([builder.load(ptr)])
+        rows_raw_args = [list(raw_args) for raw_args in zip(*cols_raw_args)]
+
+    cat_idxs = [i for i, f in enumerate(forest.features) if f.is_categorical]
+    rows_args = []
+    for raw_args in rows_raw_args:
+        args = list(raw_args)
+        # cast the categorical inputs to integer
+        if len(cat_idxs) > 1:
+            # cast all categoricals of the row at once, as a vector
+            vec_t = ir.VectorType(DOUBLE, len(cat_idxs))
+            vec = ir.Constant(vec_t, ir.Undefined)
+            for k, i in enumerate(cat_idxs):
+                vec = builder.insert_element(vec, raw_args[i], iconst(k))
+            vec = _populate_categorical_cast(builder, vec)
+            for k, i in enumerate(cat_idxs):
+                args[i] = builder.extract_element(vec, iconst(k))
+        else:
+            for i in cat_idxs:
+                args[i] = _populate_categorical_cast(builder, raw_args[i])
+        rows_args.append(args)
+    return rows_args
+
+
+def _populate_categorical_cast(builder, val):
+    """Casts the categorical val (a DOUBLE or a vector of DOUBLEs) to INT_CAT."""
+    if isinstance(val.type, ir.VectorType):
+        int_t = ir.VectorType(INT_CAT, val.type.count)
+        zero = ir.Constant(val.type, [0.0] * val.type.count)
+        int_min = ir.Constant(int_t, [-(2**31)] * val.type.count)
+    else:
+        int_t = INT_CAT
+        zero = dconst(0.0)
+        int_min = iconst(-(2**31))
+    # first, check if the value is NaN
+    is_nan = builder.fcmp_ordered("uno", val, zero)
+    # if it is, return smallest possible int (will always go right), else cast to int
+    return builder.select(is_nan, int_min, builder.fptosi(val, int_t))
 
 
-def _populate_forest_func(forest, root_func, tree_funcs, fblocksize):
+def _populate_forest_func(forest, root_func, tree_funcs, fblocksize, fbatchsize):
     """Populate root function IR for forest"""
 
     assert fblocksize > 0
+    assert fbatchsize > 0
     # generate the setup-blocks upfront, so each instruction_block can be passed its successor
     instr_blocks = [
         (
@@ -259,6 +544,9 @@ def _populate_forest_func(forest, root_func, tree_funcs, fblocksize):
     for i, (setup_block, tree_func_chunk) in enumerate(instr_blocks):
         next_block = instr_blocks[i + 1][0] if i < len(instr_blocks) - 1 else term_block
         eval_objective_func = next_block == term_block
+        # the first instruction block writes the output array, the following ones add to it.
+        # Forests that fit into a single block never read the output array.
+        init_out = i == 0
         _populate_instruction_block(
             forest,
             root_func,
@@ -266,30 +554,56 @@ def _populate_forest_func(forest, root_func, tree_funcs, fblocksize):
             setup_block,
             next_block,
             eval_objective_func,
+            init_out,
+            fbatchsize,
         )
 
 
+def _declare_fp_intrinsic(module, intrinsic, val_t, n_args):
+    """
+    Declares a floating-point intrinsic that takes n_args arguments of type val_t and returns val_t.
+    Unlike Module.declare_intrinsic this also supports vector types.
+    """
+    if isinstance(val_t, ir.VectorType):
+        suffix = f"v{val_t.count}{val_t.element.intrinsic_name}"
+    else:
+        suffix = val_t.intrinsic_name
+    name = f"{intrinsic}.{suffix}"
+    if name in module.globals:
+        return module.globals[name]
+    return ir.Function(module, ir.FunctionType(val_t, (val_t,) * n_args), name=name)
+
+
 def _populate_objective_func_block(
     builder, args, objective: str, objective_config: str, raw_score: bool
 ):
     """
-    Takes the objective function specification and generates the code for it into the builder
+    Takes the objective function specification and generates the code for it into the builder.
+    The args are either DOUBLEs or vectors of DOUBLEs, in which case the objective is computed element-wise.
     """
-    llvm_exp = builder.module.declare_intrinsic("llvm.exp", (DOUBLE,))
-    llvm_log = builder.module.declare_intrinsic("llvm.log", (DOUBLE,))
-    llvm_copysign = builder.module.declare_intrinsic(
-        "llvm.copysign", (DOUBLE, DOUBLE), ir.FunctionType(DOUBLE, (DOUBLE, DOUBLE))
-    )
+    val_t = args[0].type
+
+    def call_intrinsic(intrinsic, *intrinsic_args):
+        # intrinsics are only declared once they're used, each declaration is shared by the whole module
+        func = _declare_fp_intrinsic(
+            builder.module, intrinsic, val_t, len(intrinsic_args)
+        )
+        return builder.call(func, intrinsic_args)
+
+    def const(value):
+        if isinstance(val_t, ir.VectorType):
+            return ir.Constant(val_t, [value] * val_t.count)
+        return dconst(value)
 
     def _populate_sigmoid(alpha):
         if alpha <= 0:
             raise ValueError(f"Sigmoid parameter needs to be >0, is {alpha}")
 
         # 1 / (1 + exp(- alpha * x))
-        inner = builder.fmul(dconst(-alpha), args[0])
-        exp = builder.call(llvm_exp, [inner])
-        denom = builder.fadd(dconst(1.0), exp)
-        return builder.fdiv(dconst(1.0), denom)
+        inner = builder.fmul(const(-alpha), args[0])
+        exp = call_intrinsic("llvm.exp", inner)
+        denom = builder.fadd(const(1.0), exp)
+        return builder.fdiv(const(1.0), denom)
 
     # raw score means we don't need to add the objective function
     if raw_score:
@@ -303,10 +617,10 @@ def _populate_objective_func_block(
     elif objective in ("xentlambda", "cross_entropy_lambda"):
         # naive implementation which will be numerically unstable for small x.
         # should be changed to log1p
-        exp = builder.call(llvm_exp, [args[0]])
-        result = builder.call(llvm_log, [builder.fadd(dconst(1.0), exp)])
+        exp = call_intrinsic("llvm.exp", args[0])
+        result = call_intrinsic("llvm.log", builder.fadd(const(1.0), exp))
     elif objective in ("poisson", "gamma", "tweedie"):
-        result = builder.call(llvm_exp, [args[0]])
+        result = call_intrinsic("llvm.exp", args[0])
     elif objective in (
         "regression",
         "regression_l1",
@@ -317,7 +631,7 @@ def _populate_objective_func_block(
     ):
         if objective_config and "sqrt" in objective_config:
             arg = args[0]
-            result = builder.call(llvm_copysign, [builder.fmul(arg, arg), arg])
+            result = call_intrinsic("llvm.copysign", builder.fmul(arg, arg), arg)
         else:
             result = args[0]
     elif objective in ("lambdarank", "rank_xendcg", "custom"):
@@ -325,9 +639,9 @@ def _populate_objective_func_block(
     elif objective == "multiclass":
         assert len(args)
         # TODO Might profit from vectorization, needs testing
-        result = [builder.call(llvm_exp, [arg]) for arg in args]
+        result = [call_intrinsic("llvm.exp", arg) for arg in args]
 
-        denominator = dconst(0.0)
+        denominator = const(0.0)
         for r in result:
             denominator = builder.fadd(r, denominator)
 
@@ -339,35 +653,41 @@ def _populate_objective_func_block(
     return result if len(args) > 1 else [result]
 
 
-def _populate_categorical_node_block(
-    func, builder, bitset_comp_builder, node, bitset_comp_block, right_block
-):
+def _populate_categorical_node_block(func, builder, node):
     """Populate block with IR for categorical node"""
     val = func.args[node.split_feature]
 
     # For categoricals, processing NaNs happens in the Forest root, by explicitly checking for them
     # NaNs are converted to negative max_val, which never exists in the Bitset, so they always go right
 
-    # Find in bitset
-    # First, check value > max categorical
-    comp = builder.icmp_unsigned(
+    # Find in bitset. Branchless: Values > max categorical go right by and-ing the bitset lookup with
+    # the range check. Negative values are > max categorical when compared unsigned.
+    in_range = builder.icmp_unsigned(
         "<",
         val,
         iconst(32 * len(node.cat_threshold)),
     )
-    builder.cbranch(comp, bitset_comp_block, right_block)
-
-    idx = bitset_comp_builder.udiv(val, iconst(32))
-    bit_vecs = ir.Constant(
-        ir.VectorType(INT, len(node.cat_threshold)),
-        [ir.Constant(INT, i) for i in node.cat_threshold],
-    )
-    shift = bitset_comp_builder.urem(val, iconst(32))
-    # pick relevant bitvector
-    bit_vec = bitset_comp_builder.extract_element(bit_vecs, idx)
+    # bit index and bitvector index of val: val % 32 and val / 32 for unsigned val
+    shift = builder.and_(val, iconst(31))
+    if len(node.cat_threshold) == 1:
+        bit_vec = ir.Constant(INT, node.cat_threshold[0])
+    else:
+        # clamp the index so that the lookup stays inside the bitset for out-of-range values
+        idx = builder.lshr(builder.select(in_range, val, iconst(0)), iconst(5))
+        # the bitvectors are stored in a constant global array, a lookup is a single load
+        bit_vecs_t = ir.ArrayType(INT, len(node.cat_threshold))
+        bit_vecs = ir.GlobalVariable(
+            func.module, bit_vecs_t, name=f"{func.name}_cat_{node.idx}"
+        )
+        bit_vecs.initializer = ir.Constant(bit_vecs_t, node.cat_threshold)
+        bit_vecs.global_constant = True
+        bit_vecs.linkage = "private"
+        bit_vecs.unnamed_addr = True
+        # pick relevant bitvector
+        bit_vec = builder.load(builder.gep(bit_vecs, (iconst(0), idx), inbounds=True))
     # check bitvector contains
-    bit_entry = bitset_comp_builder.lshr(bit_vec, shift)
-    comp = bitset_comp_builder.trunc(bit_entry, BOOL)
+    bit_entry = builder.lshr(bit_vec, shift)
+    comp = builder.and_(in_range, builder.trunc(bit_entry, BOOL))
     return comp
 
 
@@ -375,7 +695,8 @@ def _populate_numerical_node_block(func, builder, node):
     """populate block with IR for numerical node"""
     val = func.args[node.split_feature]
 
-    thresh = ir.Constant(DOUBLE, node.threshold)
+    # the threshold is embedded bit-exact, llvmlite formats double constants as their hex bit pattern
+    thresh = dconst(node.threshold)
     missing_t = node.decision_type.missing_type
 
     # If missingType != MNaN, LightGBM treats NaNs values as if they were 0.0.
@@ -389,25 +710,23 @@ def _populate_numerical_node_block(func, builder, node):
     else:
         default_left = node.decision_type.is_default_left
 
-    # MissingType.MZero: Treat 0s (and NaNs) as missing values
+    # MissingType.MZero: Treat 0s (and NaNs) as missing values.
+    # The threshold comparison already sends NaNs to the default side. 0.0 needs an extra check only
+    # if the threshold comparison would send it to the non-default side.
+    is_zero_side_missing = missing_t == MissingType.MZero and not (
+        (default_left and 0.0 <= node.threshold)
+        or (not default_left and node.threshold < 0.0)
+    )
     if default_left:
-        if missing_t != MissingType.MZero or (
-            missing_t == MissingType.MZero and 0.0 <= node.threshold
-        ):
-            # unordered cmp: we'll get True (and go left) if any arg is qNaN
-            comp = builder.fcmp_unordered("<=", val, thresh)
-        else:
-            is_missing = builder.fcmp_unordered("==", val, fconst(0.0))
-            less_eq = builder.fcmp_unordered("<=", val, thresh)
-            comp = builder.or_(is_missing, less_eq)
+        # unordered cmp: we'll get True (and go left) if any arg is qNaN
+        comp = builder.fcmp_unordered("<=", val, thresh)
+        if is_zero_side_missing:
+            is_zero = builder.fcmp_ordered("==", val, dconst(0.0))
+            comp = builder.or_(is_zero, comp)
     else:
-        if missing_t != MissingType.MZero or (
-            missing_t == MissingType.MZero and node.threshold < 0.0
-        ):
-            # ordered cmp: we'll get False (and go right) if any arg is qNaN
-            comp = builder.fcmp_ordered("<=", val, thresh)
-        else:
-            is_missing = builder.fcmp_unordered("==", val, fconst(0.0))
-            greater = builder.fcmp_ordered(">", val, thresh)
-            comp = builder.not_(builder.or_(is_missing, greater))
+        # ordered cmp: we'll get False (and go right) if any arg is qNaN
+        comp = builder.fcmp_ordered("<=", val, thresh)
+        if is_zero_side_missing:
+            is_not_zero = builder.fcmp_unordered("!=", val, dconst(0.0))
+            comp = builder.and_(is_not_zero, comp)
     return comp
@@ -3,22 +3,25 @@ import os
 import llvmlite.binding as llvm
 import llvmlite.ir
 
-from lleaves.compiler.ast import parse_to_ast
+from lleaves.compiler.ast import parse_to_ast, prune
 from lleaves.compiler.codegen import gen_forest
 
 
 def compile_to_module(
     file_path,
     fblocksize=34,
+    fbatchsize=1,
+    flayout="C",
     finline=True,
     raw_score=False,
     froot_func_name="forest_root",
 ):
     forest = parse_to_ast(file_path)
     forest.raw_score = raw_score
+    prune(forest)
 
     ir = llvmlite.ir.Module(name="forest")
-    gen_forest(forest, ir, fblocksize, froot_func_name)
+    gen_forest(forest, ir, fblocksize, fbatchsize, flayout, finline, froot_func_name)
 
     ir.triple = llvm.get_process_triple()
     module = llvm.parse_assembly(str(ir))
@@ -31,6 +34,8 @@ def compile_to_module(
     # Create optimizer
     pmb = llvm.PassManagerBuilder()
     pmb.opt_level = 3
+    pmb.loop_vectorize = True
+    pmb.slp_vectorize = True
 
     if finline:
         # if inline_threshold is set LLVM inlines, precise value doesn't seem to matter
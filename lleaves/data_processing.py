@@ -94,15 +94,16 @@ def data_to_ndarray(data, pd_traintime_categories: Optional[List[List]] = None):
     return data
 
 
-def ndarray_to_ptr(data: np.ndarray):
+def ndarray_to_ptr(data: np.ndarray, order="C"):
     """
     Takes a 2D numpy array, converts to float64 if necessary and returns a pointer
 
     :param data: 2D numpy array. Copying is avoided if possible.
+    :param order: Memory layout of the returned array, "C" (row-major) or "F" (column-major).
     :return: pointer to 1D array of dtype float64.
     """
     # ravel makes sure we get a contiguous array in memory and not some strided View
-    data = data.astype(np.float64, copy=False, casting="same_kind").ravel()
+    data = data.astype(np.float64, copy=False, casting="same_kind").ravel(order=order)
     ptr = data.ctypes.data_as(POINTER(c_double))
     return ptr
 
@@ -23,6 +23,18 @@ ENTRY_FUNC_TYPE = CFUNCTYPE(
     c_int32,  # start index
     c_int32,  # end index
 )
+# entry function for column-major data, needs the total number of rows to locate each column
+ENTRY_FUNC_TYPE_F = CFUNCTYPE(
+    None,  # return void
+    POINTER(c_double),  # pointer to data array
+    POINTER(c_double),  # pointer to results array
+    c_int32,  # start index
+    c_int32,  # end index
+    c_int32,  # number of rows in data array
+)
+# Minimum number of rows each prediction thread gets if the number of threads isn't set explicitly.
+# Smaller inputs use fewer threads, since starting a thread costs about as much as predicting a few hundred rows.
+MIN_ROWS_PER_THREAD = 1024
 
 
 class Model:
@@ -41,6 +53,8 @@ class Model:
 
     # prediction function, drops GIL on entry
     _c_entry_func = None
+    # memory layout of the input data expected by the prediction function, "C" or "F"
+    _layout = None
 
     def __init__(self, model_file):
         """
@@ -83,14 +97,17 @@ class Model:
         *,
         raw_score=False,
         fblocksize=34,
+        fbatchsize=1,
+        flayout="C",
         fcodemodel="large",
         finline=True,
         froot_func_name="forest_root",
+        fcpu_features=None,
     ):
         """
         Generate the LLVM IR for this model and compile it to ASM.
 
-        For most users tweaking the compilation flags (fcodemodel, fblocksize, finline) will be unnecessary
+        For most users tweaking the compilation flags (fcodemodel, fblocksize, fbatchsize, flayout, finline) will be unnecessary
         as the default configuration is already very fast.
         Modifying the flags is useful only if you're trying to squeeze out the last few percent of performance.
 
@@ -102,6 +119,14 @@ class Model:
         :param fblocksize: Trees are cache-blocked into blocks of this size, reducing the icache miss-rate.
             For deep trees or small caches a lower blocksize is better. For single-row predictions cache-blocking
             adds overhead, set `fblocksize=Model.num_trees()` to disable it.
+        :param fbatchsize: Number of rows that are evaluated together in each iteration of the prediction loop.
+            The tree code is duplicated for each row in a batch, which increases compilation time and binary size.
+            Whether batching speeds up prediction depends on the model and the CPU, it usually doesn't.
+            Defaults to 1 (no batching).
+        :param flayout: Memory layout in which the compiled function reads the input data.
+            One of {"C" (row-major), "F" (column-major)}. With "F" the data is converted to column-major
+            once before prediction. Column-major input is faster for wide datasets where each tree uses
+            only a few of the features. Loading a cache that was compiled for the other layout raises a ValueError.
         :param fcodemodel: The LLVM codemodel. Relates to the maximum offsets that may appear in an ASM instruction.
             One of {"small", "large"}.
             The small codemodel will give speedups for most forests, but will segfault when used for compiling
@@ -109,18 +134,28 @@ class Model:
         :param finline: Whether or not to inline function. Setting this to False will speed-up compilation time
             significantly but will slow down prediction.
         :param froot_func_name: Name of entry point function in the compiled binary. This is the function to link when
-            writing a C function wrapper. Defaults to "forest_root".
+            writing a C function wrapper. Defaults to "forest_root". For flayout="F" the name is suffixed with "_F".
+        :param fcpu_features: LLVM feature string (eg "-avx2,-avx512f") that overrides the features detected
+            for the host CPU. Useful for reproducible binaries, eg when the cache is shared between machines.
+            Defaults to None (use all features of the host CPU).
         """
         assert 0 < fblocksize
+        assert 0 < fbatchsize
+        assert flayout in ("C", "F")
         assert fcodemodel in ("small", "large")
 
+        # the layout is part of the entry function's name, so a binary compiled for the other layout fails to load
+        root_func_name = froot_func_name if flayout == "C" else f"{froot_func_name}_F"
+
         if cache is None or not Path(cache).exists():
             module = compiler.compile_to_module(
                 self.model_file,
                 raw_score=raw_score,
                 fblocksize=fblocksize,
+                fbatchsize=fbatchsize,
+                flayout=flayout,
                 finline=finline,
-                froot_func_name=froot_func_name,
+                froot_func_name=root_func_name,
             )
         else:
             # when loading binary from cache we use a dummy empty module
@@ -128,16 +163,25 @@ class Model:
 
         # keep a reference to the engine to protect it from being garbage-collected
         self._execution_engine = compile_module_to_asm(
-            module, cache, fcodemodel=fcodemodel
+            module, cache, fcodemodel=fcodemodel, force_features=fcpu_features
         )
 
         # Drops GIL during call, re-acquires it after
-        addr = self._execution_engine.get_function_address(froot_func_name)
-        self._c_entry_func = ENTRY_FUNC_TYPE(addr)
+        addr = self._execution_engine.get_function_address(root_func_name)
+        if addr == 0:
+            raise ValueError(
+                f"Entry function '{root_func_name}' not found in the compiled binary. "
+                "When loading from cache, flayout and froot_func_name need to match the cached binary."
+            )
+        if flayout == "F":
+            self._c_entry_func = ENTRY_FUNC_TYPE_F(addr)
+        else:
+            self._c_entry_func = ENTRY_FUNC_TYPE(addr)
+        self._layout = flayout
 
         self.is_compiled = True
 
-    def predict(self, data, n_jobs=os.cpu_count()):
+    def predict(self, data, n_jobs=None):
         """
         Return predictions for the given data.
 
@@ -145,8 +189,8 @@ class Model:
 
         :param data: Pandas df, numpy 2D array or Python list. Shape should be (n_rows, model.num_feature()).
             2D float64 numpy arrays have the lowest overhead.
-        :param n_jobs: Number of threads to use for prediction. Defaults to number of CPUs. For single-row prediction
-            this should be set to 1.
+        :param n_jobs: Number of threads to use for prediction. Defaults to the number of CPUs, but at most one
+            thread per ``MIN_ROWS_PER_THREAD`` rows. For single-row prediction this should be set to 1.
         :return: 1D numpy array, dtype float64.
             If multiclass model: 2D numpy array of shape (n_rows, model.num_model_per_iteration())
         """
@@ -170,27 +214,41 @@ class Model:
             )
 
         # setup input data and predictions array
-        ptr_data = ndarray_to_ptr(data)
+        ptr_data = ndarray_to_ptr(data, order=self._layout)
+        # column-major data is passed together with its number of rows
+        layout_args = (n_predictions,) if self._layout == "F" else ()
 
         pred_shape = (
             n_predictions if self._n_classes == 1 else (n_predictions, self._n_classes)
         )
+        # binaries from older caches add to the output array instead of overwriting it
         predictions = np.zeros(pred_shape, dtype=np.float64)
         ptr_preds = ndarray_to_ptr(predictions)
 
+        # Rows are predicted independently of each other (the objective function is applied
+        # elementwise), so contiguous chunks of rows can be computed in parallel.
+        # The entry function drops the GIL, giving every thread its own core.
+        if n_jobs is None:
+            n_jobs = min(os.cpu_count() or 1, n_predictions // MIN_ROWS_PER_THREAD)
+        # there's no point in using more threads than rows
+        n_jobs = max(1, min(n_jobs, n_predictions))
         if n_jobs == 1:
-            self._c_entry_func(ptr_data, ptr_preds, 0, n_predictions)
+            self._c_entry_func(ptr_data, ptr_preds, 0, n_predictions, *layout_args)
         else:
             batchsize = math.ceil(n_predictions / n_jobs)
             with concurrent.futures.ThreadPoolExecutor(max_workers=n_jobs) as executor:
-                for i in range(0, n_predictions, batchsize):
+                futures = [
                     executor.submit(
-                        lambda start_idx: self._c_entry_func(
-                            ptr_data,
-                            ptr_preds,
-                            start_idx,
-                            min(start_idx + batchsize, n_predictions),
-                        ),
-                        i,
+                        self._c_entry_func,
+                        ptr_data,
+                        ptr_preds,
+                        start_idx,
+                        min(start_idx + batchsize, n_predictions),
+                        *layout_args,
                     )
+                    for start_idx in range(0, n_predictions, batchsize)
+                ]
+                # re-raise exceptions from the worker threads
+                for future in futures:
+                    future.result()
         return predictions
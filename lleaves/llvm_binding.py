@@ -1,43 +1,70 @@
 import os
+from functools import lru_cache
 from pathlib import Path
 
 import llvmlite.binding as llvm
 
+_initialized = False
+
 
 def _initialize_llvm():
-    # this initializes the per-process LLVM state. It's save to call multiple times.
+    # this initializes the per-process LLVM state. It's save to call multiple times,
+    # but only the first call does any work.
     # TODO we never call llvm.shutdown(), is this a problem?
     # some parts of the llvm memory are only deallocated once the process exits
+    global _initialized
+    if _initialized:
+        return
     llvm.initialize()
     llvm.initialize_native_target()
     llvm.initialize_native_asmprinter()
+    _initialized = True
+
 
+@lru_cache(maxsize=None)
+def _get_host_cpu():
+    """Returns name and feature string of the host CPU, which don't change during the process lifetime."""
+    try:
+        # LLVM raises if features cannot be detected
+        features = llvm.get_host_cpu_features().flatten()
+    except RuntimeError:
+        features = ""
+    return llvm.get_host_cpu_name(), features
 
-def _get_target_machine(fcodemodel="large"):
+
+def _get_target_machine(fcodemodel="large", force_features=None):
     target = llvm.Target.from_triple(llvm.get_process_triple())
-    # try:
-    #     # LLVM raises if features cannot be detected
-    #     features = llvm.get_host_cpu_features().flatten()
-    # except RuntimeError:
-    #     features = ""
-    features = '+64bit,+adx,+aes,-amx-bf16,-amx-int8,-amx-tile,+avx,+avx2,-avx512bf16,-avx512bitalg,-avx512bw,-avx512cd,-avx512dq,-avx512er,-avx512f,-avx512ifma,-avx512pf,-avx512vbmi,-avx512vbmi2,-avx512vl,-avx512vnni,-avx512vp2intersect,-avx512vpopcntdq,+bmi,+bmi2,-cldemote,-clflushopt,-clwb,-clzero,+cmov,+cx16,+cx8,-enqcmd,+f16c,+fma,-fma4,+fsgsbase,+fxsr,-gfni,+invpcid,-lwp,+lzcnt,+mmx,+movbe,-movdir64b,-movdiri,-mwaitx,+pclmul,-pconfig,-pku,+popcnt,-prefetchwt1,+prfchw,-ptwrite,-rdpid,+rdrnd,+rdseed,+rtm,+sahf,-serialize,-sgx,-sha,-shstk,+sse,+sse2,+sse3,+sse4.1,+sse4.2,-sse4a,+ssse3,-tbm,-tsxldtrk,-vaes,-vpclmulqdq,-waitpkg,-wbnoinvd,-xop,+xsave,-xsavec,+xsaveopt,-xsaves'
+    cpu_name, features = _get_host_cpu()
+    if force_features is not None:
+        features = force_features
 
     # large codemodel is necessary for large, ~1000 tree models.
     # for smaller models "default" codemodel would be faster.
+    # Each execution engine takes ownership of its target machine, so it can't be reused across compilations.
     target_machine = target.create_target_machine(
-        cpu=llvm.get_host_cpu_name(),
+        cpu=cpu_name,
         features=features,
+        opt=3,
         reloc="pic",
         codemodel=fcodemodel,
     )
     return target_machine
 
 
-def compile_module_to_asm(module, cache_path=None, fcodemodel="large"):
+def compile_module_to_asm(
+    module, cache_path=None, fcodemodel="large", force_features=None
+):
+    """
+    Compile the LLVM module to machine code for the host.
+
+    :param force_features: LLVM feature string (eg "+avx2,-avx512f") to compile for, instead of the features
+        detected for the host CPU. Useful for reproducible binaries.
+    :return: The execution engine holding the compiled code.
+    """
     _initialize_llvm()
 
     # Create a target machine representing the host
-    target_machine = _get_target_machine(fcodemodel)
+    target_machine = _get_target_machine(fcodemodel, force_features)
 
     # Create execution engine for our module
     execution_engine = llvm.create_mcjit_compiler(module, target_machine)
@@ -1,3 +1,6 @@
+import io
+import os
+from contextlib import redirect_stdout
 from pathlib import Path
 
 import lightgbm as lgb
@@ -243,3 +246,32 @@ def test_pure_categorical_prediction():
     ):
         assert lgbm_model.predict([data]) == [results[res_idx]]
         assert llvm_model.predict([data]) == [results[res_idx]]
+
+
+@pytest.mark.parametrize("same_feature", [True, False])
+def test_categorical_switch(tmp_path, same_feature):
+    # pure_categorical's root node splits on feature 1, its right child on feature 0
+    model_txt = tmp_path / "model.txt"
+    with open("tests/models/pure_categorical/model.txt") as infile, open(
+        model_txt, "w"
+    ) as outfile:
+        for line in infile.readlines():
+            if same_feature and line.startswith("split_feature="):
+                outfile.write("split_feature=1 1\n")
+            else:
+                outfile.write(line)
+    llvm_model = Model(model_file=str(model_txt))
+    lgbm_model = lgb.Booster(model_file=str(model_txt))
+
+    os.environ["LLEAVES_PRINT_UNOPTIMIZED_IR"] = "1"
+    f = io.StringIO()
+    with redirect_stdout(f):
+        llvm_model.compile()
+    os.environ["LLEAVES_PRINT_UNOPTIMIZED_IR"] = "0"
+
+    # both nodes split on the same feature: the tree becomes a single switch
+    assert ("switch i32" in f.getvalue()) == same_feature
+
+    categories = [float(c) for c in range(-2, 66)] + [float("NaN"), float("Inf")]
+    data = np.array([[c, c, 0.0] for c in categories])
+    np.testing.assert_equal(llvm_model.predict(data), lgbm_model.predict(data))
@@ -1,5 +1,6 @@
 import io
 import os
+import platform
 from contextlib import redirect_stdout
 
 import numpy as np
@@ -10,6 +11,7 @@ from lightgbm import Booster
 from benchmarks.benchmark import NYC_used_columns
 from benchmarks.train_NYC_model import feature_enginering
 from lleaves import Model
+from lleaves.data_processing import ndarray_to_ptr
 
 
 @pytest.fixture(scope="session")
@@ -90,3 +92,70 @@ def test_function_name():
         llvm_model.predict(data, n_jobs=2),
         lgbm_model.predict(data, n_jobs=2),
     )
+
+
+def _random_data(n_features):
+    rng = np.random.default_rng(1337)
+    # 23 rows: a batch loop with remainder rows for every tested batchsize and number of threads
+    data = np.floor(rng.uniform(-5, 100, size=(23, n_features)))
+    data[rng.random(data.shape) < 0.1] = np.nan
+    return data
+
+
+@pytest.mark.parametrize("batchsize, layout", [(2, "C"), (4, "C"), (1, "F"), (3, "F")])
+@pytest.mark.parametrize(
+    "model_file",
+    ["tests/models/NYC_taxi/model.txt", "tests/models/mixed_categorical/model.txt"],
+)
+def test_batchsize_layout(model_file, batchsize, layout):
+    llvm_model = Model(model_file=model_file)
+    lgbm_model = Booster(model_file=model_file)
+    llvm_model.compile(fbatchsize=batchsize, flayout=layout, fblocksize=50)
+
+    data = _random_data(llvm_model.num_feature())
+    # with multiple threads each thread predicts a slice of rows that doesn't start at row 0
+    for n_jobs in (1, 4):
+        np.testing.assert_almost_equal(
+            llvm_model.predict(data, n_jobs=n_jobs),
+            lgbm_model.predict(data),
+        )
+
+
+@pytest.mark.parametrize("blocksize", [1, 34])
+@pytest.mark.parametrize(
+    "model_file",
+    ["tests/models/single_tree/model.txt", "tests/models/multiclass/model.txt"],
+)
+def test_overwrite_output(model_file, blocksize):
+    llvm_model = Model(model_file=model_file)
+    lgbm_model = Booster(model_file=model_file)
+    llvm_model.compile(fblocksize=blocksize)
+
+    data = _random_data(llvm_model.num_feature())
+    # the compiled function overwrites the output array, it doesn't need to be zeroed
+    preds = np.full(lgbm_model.predict(data).shape, np.nan)
+    llvm_model._c_entry_func(
+        ndarray_to_ptr(data), ndarray_to_ptr(preds), 0, data.shape[0]
+    )
+    np.testing.assert_almost_equal(preds, lgbm_model.predict(data))
+
+
+def test_cpu_features():
+    model_file = "tests/models/NYC_taxi/model.txt"
+    llvm_model = Model(model_file=model_file)
+    llvm_model.compile()
+    llvm_model_no_avx = Model(model_file=model_file)
+
+    os.environ["LLEAVES_PRINT_ASM"] = "1"
+    f = io.StringIO()
+    with redirect_stdout(f):
+        llvm_model_no_avx.compile(fcpu_features="-avx,-avx2")
+    os.environ["LLEAVES_PRINT_ASM"] = "0"
+
+    if platform.machine() in ("x86_64", "AMD64"):
+        # disabling AVX also disables AVX-512, so no 256 or 512-bit registers may be used
+        asm = f.getvalue()
+        assert "%ymm" not in asm and "%zmm" not in asm
+
+    data = _random_data(llvm_model.num_feature())
+    np.testing.assert_equal(llvm_model_no_avx.predict(data), llvm_model.predict(data))
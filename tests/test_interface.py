@@ -72,3 +72,20 @@ def test_cache_model(tmp_path):
     np.testing.assert_equal(
         pure_cat_llvm.predict([3 * [0.0], 3 * [1.0], 3 * [-1.0]]), res
     )
+
+
+def test_cache_layout(tmp_path):
+    data = [3 * [0.0], 3 * [1.0], 3 * [-1.0]]
+    lgbm = lgb.Booster(model_file="tests/models/tiniest_single_tree/model.txt")
+    for layout, other_layout in (("C", "F"), ("F", "C")):
+        cachefp = tmp_path / f"model_{layout}.bin"
+        llvm = lleaves.Model("tests/models/tiniest_single_tree/model.txt")
+        llvm.compile(cache=cachefp, flayout=layout)
+
+        cached_model = lleaves.Model("tests/models/tiniest_single_tree/model.txt")
+        cached_model.compile(cache=cachefp, flayout=layout)
+        np.testing.assert_equal(cached_model.predict(data), lgbm.predict(data))
+
+        # a binary compiled for the other layout would read the data with the wrong stride
+        with pytest.raises(ValueError, match="flayout"):
+            cached_model.compile(cache=cachefp, flayout=other_layout)
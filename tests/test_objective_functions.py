@@ -34,10 +34,11 @@ def modified_model_txt(request, tmp_path):
     return str(model_filep)
 
 
-def test_all_obj_funcs(modified_model_txt):
+@pytest.mark.parametrize("batchsize", [1, 4])
+def test_all_obj_funcs(modified_model_txt, batchsize):
     data = np.expand_dims(np.arange(-5, 5, 0.20), axis=1)
     llvm_model = Model(model_file=modified_model_txt)
-    llvm_model.compile()
+    llvm_model.compile(fbatchsize=batchsize)
     lgbm_model = lgb.Booster(model_file=modified_model_txt)
     np.testing.assert_almost_equal(lgbm_model.predict(data), llvm_model.predict(data))
 
@@ -55,7 +56,8 @@ def test_all_obj_funcs(modified_model_txt):
         ("multiclass", True),
     ],
 )
-def test_basic(tmp_path, objective, raw_score):
+@pytest.mark.parametrize("batchsize", [1, 4])
+def test_basic(tmp_path, objective, raw_score, batchsize):
     X = np.expand_dims(np.array([1, 2, 3, 1, 2, 3, 1, 2, 3]), axis=1)
     y = np.array([1, 0, 0, 1, 0, 0, 1, 0, 0])
     train_data = lgb.Dataset(X, label=y, categorical_feature=[0])
@@ -67,7 +69,7 @@ def test_basic(tmp_path, objective, raw_score):
     reg_model_f = str(tmp_path / f"{objective}.txt")
     bst.save_model(reg_model_f)
     llvm_model = Model(model_file=reg_model_f)
-    llvm_model.compile(raw_score=raw_score)
+    llvm_model.compile(raw_score=raw_score, fbatchsize=batchsize)
     np.testing.assert_almost_equal(
         bst.predict(X, raw_score=raw_score), llvm_model.predict(X)
     )
@@ -1,6 +1,24 @@
+import os
 from ctypes import POINTER, c_double
 
 import numpy as np
+import pytest
+
+import lleaves
+
+
+@pytest.fixture
+def entry_func_calls(NYC_llvm, monkeypatch):
+    """Records the row range of each call to NYC_llvm's compiled function, one call per thread"""
+    calls = []
+    entry_func = NYC_llvm._c_entry_func
+
+    def recording_entry_func(ptr_data, ptr_preds, start_idx, end_idx, *args):
+        calls.append((start_idx, end_idx))
+        entry_func(ptr_data, ptr_preds, start_idx, end_idx, *args)
+
+    monkeypatch.setattr(NYC_llvm, "_c_entry_func", recording_entry_func)
+    return calls
 
 
 def test_parallel_edgecases(NYC_llvm, NYC_lgbm):
@@ -17,6 +35,32 @@ def test_parallel_edgecases(NYC_llvm, NYC_lgbm):
     )
 
 
+def test_parallel_n_threads(NYC_llvm, NYC_lgbm, entry_func_calls, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    n_rows = 3 * lleaves.lleaves.MIN_ROWS_PER_THREAD + 5
+    data = np.ones((n_rows, NYC_lgbm.num_feature()), dtype=np.float64)
+
+    # by default each thread predicts at least MIN_ROWS_PER_THREAD rows
+    NYC_llvm.predict(data[:10])
+    assert entry_func_calls == [(0, 10)]
+    entry_func_calls.clear()
+    np.testing.assert_almost_equal(
+        NYC_llvm.predict(data), NYC_lgbm.predict(data), decimal=14
+    )
+    assert len(entry_func_calls) == 3
+
+    # an explicit number of threads is used as is, but never more threads than rows
+    entry_func_calls.clear()
+    NYC_llvm.predict(data[:10], n_jobs=4)
+    assert sorted(entry_func_calls) == [(0, 3), (3, 6), (6, 9), (9, 10)]
+    entry_func_calls.clear()
+    NYC_llvm.predict(data[:2], n_jobs=4)
+    assert sorted(entry_func_calls) == [(0, 1), (1, 2)]
+    entry_func_calls.clear()
+    assert NYC_llvm.predict(data[:0], n_jobs=4).shape == (0,)
+    assert entry_func_calls == [(0, 0)]
+
+
 def test_parallel_iteration(NYC_llvm, NYC_lgbm):
     data = np.array(4 * [NYC_lgbm.num_feature() * [1.0]], dtype=np.float64)
     data_flat = np.array(data.reshape(data.size), dtype=np.float64)
@@ -0,0 +1,102 @@
+import lightgbm as lgb
+import numpy.testing as npt
+import pytest
+
+import lleaves
+from lleaves.compiler.ast import parse_to_ast
+from lleaves.compiler.ast.simplify import prune
+
+
+def _n_decision_nodes(forest):
+    n_nodes = 0
+    stack = [tree.root_node for tree in forest.trees]
+    while stack:
+        node = stack.pop()
+        if not node.is_leaf:
+            n_nodes += 1
+            stack += [node.left, node.right]
+    return n_nodes
+
+
+def _assert_pruned_like_lightgbm(model_file, data, n_pruned):
+    forest = parse_to_ast(model_file)
+    n_nodes = _n_decision_nodes(forest)
+    prune(forest)
+    assert _n_decision_nodes(forest) == n_nodes - n_pruned
+
+    lgbm_model = lgb.Booster(model_file=model_file)
+    llvm_model = lleaves.Model(model_file=model_file)
+    llvm_model.compile()
+    npt.assert_equal(llvm_model.predict(data), lgbm_model.predict(data))
+
+
+# 0: MissingType None, default right
+# 2: MissingType None, default left
+# 4: MissingType 0, default right
+# 6: MissingType 0, default left
+# 8: MissingType NaN, default right
+# 10: MissingType NaN, default left
+@pytest.mark.parametrize(
+    "decision_type, is_pruned",
+    [(0, True), (2, True), (4, False), (6, True), (8, False), (10, True)],
+)
+def test_prune_infinite_threshold(tmp_path, decision_type, is_pruned):
+    model_txt = tmp_path / "model.txt"
+    with open("tests/models/tiniest_single_tree/model.txt") as infile, open(
+        model_txt, "w"
+    ) as outfile:
+        for line in infile.readlines():
+            if line.startswith("decision_type="):
+                outfile.write(line.replace("2", str(decision_type)))
+            elif line.startswith("threshold="):
+                # the root node's threshold becomes +inf
+                outfile.write("threshold=inf" + line[line.index(" ") :])
+            else:
+                outfile.write(line)
+
+    nan = float("NaN")
+    data = [
+        [0.0, 1.0, 1.0],
+        [0.0, -1.0, -1.0],
+        [0.0, 0.5, 0.9],
+        [0.0, 0.0, 0.0],
+        [0.0, 1e300, 0.0],
+        [0.0, nan, 0.86],
+        [nan, nan, nan],
+        [None, None, None],
+    ]
+    # pruning the root removes the root's right subtree as well
+    _assert_pruned_like_lightgbm(str(model_txt), data, 2 if is_pruned else 0)
+
+
+@pytest.mark.parametrize("decision_type", [1, 3, 5, 7, 9, 11])
+@pytest.mark.parametrize(
+    "cat_threshold, n_pruned",
+    [("0 23", 1), ("576 0", 1), ("0 0", 2), ("4294967295 23", 0)],
+)
+def test_prune_empty_bitset(tmp_path, decision_type, cat_threshold, n_pruned):
+    model_txt = tmp_path / "model.txt"
+    with open("tests/models/pure_categorical/model.txt") as infile, open(
+        model_txt, "w"
+    ) as outfile:
+        for line in infile.readlines():
+            if line.startswith("decision_type"):
+                outfile.write(line.replace("1", str(decision_type)))
+            elif line.startswith("cat_threshold"):
+                outfile.write(f"cat_threshold={cat_threshold}\n")
+            else:
+                outfile.write(line)
+
+    nan = float("NaN")
+    data = [
+        [1.0, 6.0, 0.0],
+        [0.0, 9.0, 0.0],
+        [4.0, 31.0, 0.0],
+        [2.0, 32.0, 0.0],
+        [nan, 6.0, 0.0],
+        [1.0, nan, 0.0],
+        [1.0, -1.0, 0.0],
+        [nan, nan, nan],
+        [None, None, None],
+    ]
+    _assert_pruned_like_lightgbm(str(model_txt), data, n_pruned)
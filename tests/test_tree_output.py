@@ -156,3 +156,50 @@ def test_multiclass_generated(tmpdir):
         lgbm.predict(X, n_jobs=2), llvm.predict(X, n_jobs=2), decimal=10
     )
     assert lgbm.num_model_per_iteration() == llvm.num_model_per_iteration()
+
+
+def test_thresholds_bit_exact(tmpdir):
+    """Values right next to a threshold need to go the same way as in LightGBM"""
+    # thresholds whose decimal representation needs all 17 significant digits
+    thresholds = "0.30000000000000004 -1.7976931348623157e+308 2.2250738585072014e-308"
+    model_file = str(tmpdir / "model.txt")
+    with open("tests/models/tiniest_single_tree/model.txt") as infile, open(
+        model_file, "w"
+    ) as outfile:
+        for line in infile.readlines():
+            if line.startswith("threshold="):
+                outfile.write(f"threshold={thresholds}\n")
+            else:
+                outfile.write(line)
+
+    lgbm = lightgbm.Booster(model_file=model_file)
+    llvm = lleaves.Model(model_file=model_file)
+    llvm.compile()
+
+    values = [float(t) for t in thresholds.split()]
+    # the values one ulp on either side of each threshold, except:
+    # - the lowest finite double has no lower neighbour (it would overflow to -inf)
+    # - LightGBM treats inputs with an absolute value <= 1e-35 as 0.0, hence no neighbours of the last threshold
+    values += [
+        np.nextafter(values[0], -np.inf),
+        np.nextafter(values[0], np.inf),
+        np.nextafter(values[1], np.inf),
+    ]
+    data = np.array([[0.0, v1, v2] for v1 in values for v2 in values])
+    np.testing.assert_equal(llvm.predict(data), lgbm.predict(data))
+
+
+@pytest.mark.parametrize(
+    "model_file",
+    ["tests/models/boston_housing/model.txt", "tests/models/NYC_taxi/model.txt"],
+)
+def test_sum_bit_exact(model_file):
+    """Trees are summed up in the same order as in LightGBM, so predictions are bit-identical"""
+    lgbm = lightgbm.Booster(model_file=model_file)
+    llvm = lleaves.Model(model_file=model_file)
+    # a single cache block, so there's no intermediate sum stored in the output array
+    llvm.compile(fblocksize=llvm.num_trees())
+
+    rng = np.random.default_rng(1337)
+    data = rng.uniform(-5, 100, size=(5000, llvm.num_feature()))
+    np.testing.assert_equal(llvm.predict(data), lgbm.predict(data))